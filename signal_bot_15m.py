@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 # strict_signal_with_indicators.py
 # Multi-pair 15m scanner:
-# - Checks only CLOSED 15m candles
+# - Streams 15m klines over WebSocket (ccxt.pro), or polls REST concurrently,
+#   and checks only CLOSED candles
 # - Detects HAMMER and SHOOTING STAR
 # - Requires trend confirmation on previous 5 candles
-# - Adds indicators: volume filter, RSI (14), EMA20/EMA50
+# - Adds indicators: volume filter, RSI (14, Wilder), EMA20/EMA50 (TA-Lib warm-start)
 # - Sends Telegram notifications and logs signals
 
-import ccxt
-import pandas as pd
-import time
+import asyncio
+import atexit
+import ccxt.pro as ccxtpro
+import numpy as np
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
-from datetime import datetime, timezone
+import talib
+import time
+from collections import deque
+from numba import njit
+from requests.adapters import HTTPAdapter
+
+try:
+    import uvloop   # libuv event loop; not available on Windows
+except ImportError:
+    uvloop = None
 
 # ========== CONFIG ==========
 BOT_TOKEN = ""
@@ -19,9 +33,14 @@ CHAT_ID = ""
 
 PAIRS = ["ETH/USDT", "BCH/USDT", "SOL/USDT", "TON/USDT", "LINK/USDT"]
 TIMEFRAME = "15m"
-FETCH_LIMIT = 50         # need enough candles for indicators
-INTER_DELAY = 1.0        # seconds between pair fetches
+WARMUP_LIMIT = 200       # candles kept per pair; EMA_SLOW's SMA seed needs several windows to converge
+RECONNECT_DELAY = 5.0    # seconds to back off after a stream error
+USE_WEBSOCKET = True     # False -> poll REST for all pairs concurrently at each 15m close
+FETCH_CONCURRENCY = 5    # max REST fetches in flight at once
+BATCH_WINDOW = 5.0       # max seconds to gather pairs closing on the same candle into one message
+TG_MAX_LEN = 4096        # Telegram's sendMessage text limit
 LOGFILE = "signals.log"
+CACHE_DIR = "candle_cache"   # per-pair WARMUP_LIMIT closed candles, persisted across restarts
 
 # Indicator thresholds (tuneable)
 VOLUME_MULTIPLIER = 0.9  # require last vol > avg_vol * multiplier
@@ -30,56 +49,163 @@ RSI_OVERSOLD = 40       # allow hammer when RSI below this (less strict than 30)
 RSI_OVERBOUGHT = 60     # allow shooting star when RSI above this
 EMA_FAST = 20
 EMA_SLOW = 50
+VOL_WINDOW = 20          # candles in the average-volume window
+
+exchange = ccxtpro.binance({"enableRateLimit": True})
+TIMEFRAME_MS = exchange.parse_timeframe(TIMEFRAME) * 1000
+OHLCV_COLUMNS = ["ts", "open", "high", "low", "close", "volume"]
 
-exchange = ccxt.binance({"enableRateLimit": True})
+# per-pair fixed float64 buffer of CLOSED candles [ts, open, high, low, close, volume]
+# (older -> newer), filled from the end; candle_count[pair] rows at the bottom are valid
+candles = {pair: np.zeros((WARMUP_LIMIT, 6)) for pair in PAIRS}
+candle_count = {pair: 0 for pair in PAIRS}
+# per-pair candle still being formed, as last seen on the stream
+forming = {}
+# per-pair incremental indicator state, warm-started from the first full buffer
+indicators = {}
+
+
+# keep-alive HTTPS connection to Telegram, reused across messages
+_TG_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+# signal log kept open; line buffering flushes each record with a single write
+_LOG_FH = open(LOGFILE, "a", encoding="utf-8", buffering=1)
+atexit.register(_LOG_FH.close)
 
 
 # ========== UTILITIES ==========
 def send_telegram(text):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     payload = {"chat_id": CHAT_ID, "text": text, "parse_mode": "HTML"}
     try:
-        r = requests.post(url, json=payload, timeout=10)
+        r = _SESSION.post(_TG_URL, json=payload, timeout=10)
         if r.status_code != 200:
             print("Telegram send failed:", r.status_code, r.text)
     except Exception as e:
         print("Telegram error:", e)
 
 
-def log_signal(text):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    with open(LOGFILE, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {text}\n")
+def utc_stamp(t=None, fmt="%Y-%m-%d %H:%M:%S UTC"):
+    # C-level formatting, no datetime/tz objects
+    return time.strftime(fmt, time.gmtime(t))
 
 
-def fetch_ohlcv_df(symbol, timeframe=TIMEFRAME, limit=FETCH_LIMIT):
-    data = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    df = pd.DataFrame(data, columns=["ts", "open", "high", "low", "close", "volume"])
-    df["time"] = pd.to_datetime(df["ts"], unit="ms")
-    df.set_index("time", inplace=True)
-    df = df.astype(float)
-    return df
+def log_signal(text, ts=None):
+    # ts: stamp shared by all signals of a cycle; formatted here only if not given
+    _LOG_FH.write(f"[{ts or utc_stamp()}] {text}\n")
 
 
-# ========== INDICATORS ==========
-def compute_rsi(series, period=RSI_PERIOD):
-    delta = series.diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ma_up = up.rolling(period, min_periods=period).mean()
-    ma_down = down.rolling(period, min_periods=period).mean()
-    rs = ma_up / ma_down
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+def candles_array(pair):
+    # (n, 6) view of the buffered closed candles, no copy
+    return candles[pair][WARMUP_LIMIT - candle_count[pair]:]
 
 
-def compute_ema(series, period):
-    return series.ewm(span=period, adjust=False).mean()
+def cache_path(pair):
+    return os.path.join(CACHE_DIR, pair.replace("/", "_") + ".parquet")
+
+
+def load_cache(pair):
+    path = cache_path(pair)
+    if not os.path.exists(path):
+        return
+    try:
+        table = pq.read_table(path, columns=OHLCV_COLUMNS)
+        rows = np.column_stack([table.column(c).to_numpy() for c in OHLCV_COLUMNS]).astype(np.float64)
+    except Exception as e:
+        print(f"[{pair}] cache read error: {e}")
+        return
+    for candle in rows:
+        push_closed(pair, candle)
+
+
+def save_cache(pair):
+    # write to a temp file and rename, so a crash never leaves a torn parquet behind
+    path = cache_path(pair)
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        arr = candles_array(pair)
+        cols = {c: np.ascontiguousarray(arr[:, i]) for i, c in enumerate(OHLCV_COLUMNS)}
+        cols["ts"] = cols["ts"].astype(np.int64)
+        pq.write_table(pa.table(cols), tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[{pair}] cache write error: {e}")
+
+
+# ========== INDICATORS ==========
+def compute_rsi_averages(close, period=RSI_PERIOD):
+    # Wilder-smoothed average gain/loss, seeded like talib.RSI (SMA of the first
+    # `period` moves); talib only exposes the ratio, the state needs both averages
+    delta = np.diff(close)
+    moves = np.stack([np.maximum(delta, 0.0), np.maximum(-delta, 0.0)])   # gains, losses
+    # the recurrence avg = avg*(1-a) + x*a unrolled into one weighted sum per row
+    a = 1.0 / period
+    m = moves.shape[1] - period
+    weights = a * (1 - a) ** np.arange(m - 1, -1, -1)
+    gain_avg, loss_avg = (1 - a) ** m * moves[:, :period].mean(axis=1) + moves[:, period:] @ weights
+    return gain_avg, loss_avg
+
+
+@njit(cache=True)
+def rsi_from_averages(gain_avg, loss_avg):
+    if loss_avg == 0:
+        return 100.0
+    return 100 - (100 / (1 + gain_avg / loss_avg))
+
+
+def compute_ema(close, period):
+    return talib.EMA(close, timeperiod=period)
+
+
+def warm_start_indicators(pair):
+    # one-time full compute over the buffer; later candles update it in O(1)
+    arr = candles_array(pair)
+    close = np.ascontiguousarray(arr[:, 4])
+    gain_avg, loss_avg = compute_rsi_averages(close, RSI_PERIOD)
+    return {
+        "ema_fast": float(compute_ema(close, EMA_FAST)[-1]),
+        "ema_slow": float(compute_ema(close, EMA_SLOW)[-1]),
+        "gain_avg": float(gain_avg),
+        "loss_avg": float(loss_avg),
+        "close": float(close[-1]),
+        "vols": deque(arr[-VOL_WINDOW:, 5].tolist(), maxlen=VOL_WINDOW),
+        "vol_sum": float(arr[-VOL_WINDOW:, 5].sum()),
+    }
+
+
+def update_indicators(pair, candle):
+    state = indicators.get(pair)
+    if state is None:
+        # talib.EMA needs a full EMA_SLOW window before it yields a value; the rest of
+        # the WARMUP_LIMIT history then carries it forward, same as talib over all of it
+        if candle_count[pair] >= max(EMA_SLOW, RSI_PERIOD + 1):
+            indicators[pair] = warm_start_indicators(pair)
+        return
+
+    close, vol = float(candle[4]), float(candle[5])
+    for key, period in (("ema_fast", EMA_FAST), ("ema_slow", EMA_SLOW)):
+        alpha = 2 / (period + 1)
+        state[key] = alpha * close + (1 - alpha) * state[key]
+
+    delta = close - state["close"]
+    n = RSI_PERIOD
+    state["gain_avg"] = (state["gain_avg"] * (n - 1) + max(delta, 0.0)) / n
+    state["loss_avg"] = (state["loss_avg"] * (n - 1) + max(-delta, 0.0)) / n
+    state["close"] = close
+
+    # running window sum: drop the volume falling out before appending the new one
+    vols = state["vols"]
+    if len(vols) == VOL_WINDOW:
+        state["vol_sum"] -= vols[0]
+    vols.append(vol)
+    state["vol_sum"] += vol
 
 
 # ========== CANDLE PATTERN LOGIC ==========
-def is_hammer_candle(c):
-    o, h, l, cl = c["open"], c["high"], c["low"], c["close"]
+@njit(fastmath=True, cache=True)
+def is_hammer_candle(o, h, l, cl):
     body = abs(cl - o)
     if body == 0:
         return False
@@ -89,8 +215,8 @@ def is_hammer_candle(c):
     return (lower > body * 1.8) and (upper < body * 0.6)
 
 
-def is_shooting_star_candle(c):
-    o, h, l, cl = c["open"], c["high"], c["low"], c["close"]
+@njit(fastmath=True, cache=True)
+def is_shooting_star_candle(o, h, l, cl):
     body = abs(cl - o)
     if body == 0:
         return False
@@ -100,122 +226,295 @@ def is_shooting_star_candle(c):
 
 
 # trend confirmation on previous N candles (5 by default)
-def trend_confirmation(candles, direction="down", required_count=3):
-    # candles: list of dict-like rows (older -> newer)
+@njit(fastmath=True, cache=True)
+def trend_confirmation(arr, direction="down", required_count=3):
+    # arr: candle rows (older -> newer), columns ts, open, high, low, close, volume
     # direction = "down" for hammer, "up" for shooting star
-    closes = [c["close"] for c in candles]
-    # requirement 1: at least required_count bearish/bullish among them
-    if direction == "down":
-        count_bear = sum(1 for c in candles if c["close"] < c["open"])
-        falling = closes[-1] < closes[0]  # end lower than start
-        return (count_bear >= required_count) and falling
-    else:
-        count_bull = sum(1 for c in candles if c["close"] > c["open"])
-        rising = closes[-1] > closes[0]
-        return (count_bull >= required_count) and rising
+    moves = arr[:, 4] - arr[:, 1]     # close - open per candle
+    drift = arr[-1, 4] - arr[0, 4]    # end vs start
+    if direction != "down":
+        moves, drift = -moves, -drift
+    # at least required_count bearish (bullish) candles, ending lower (higher) than start
+    return np.count_nonzero(moves < 0) >= required_count and drift < 0
 
 
-# full analysis for a pair
-def analyze_pair(pair):
-    try:
-        df = fetch_ohlcv_df(pair)
-    except Exception as e:
-        print(f"[{pair}] fetch error: {e}")
-        return []
+# compiled signal kernels, one per distinct threshold config
+_EVALUATORS = {}
+
+
+def make_evaluator(volume_multiplier, rsi_oversold, rsi_overbought, required_count=3):
+    # The thresholds are closed over, so numba folds them into the kernel as
+    # literals instead of looking them up on every call.
+    key = (volume_multiplier, rsi_oversold, rsi_overbought, required_count)
+    if key in _EVALUATORS:
+        return _EVALUATORS[key]
+
+    # arr: last 6 closed candles (previous 5 = trend, last = pattern)
+    @njit(fastmath=True)
+    def evaluate(arr, ema_fast, ema_slow, gain_avg, loss_avg, avg_vol):
+        o, h, l, cl = arr[-1, 1], arr[-1, 2], arr[-1, 3], arr[-1, 4]
+        hammer = is_hammer_candle(o, h, l, cl) and trend_confirmation(arr[:-1], "down", required_count)
+        star = is_shooting_star_candle(o, h, l, cl) and trend_confirmation(arr[:-1], "up", required_count)
+        # most candles are neither pattern; skip the indicator gates entirely
+        if not (hammer or star):
+            return 0, 0, 0.0
+
+        rsi = rsi_from_averages(gain_avg, loss_avg)
+        vol_ok = arr[-1, 5] >= avg_vol * volume_multiplier
+        # hammer: short-term EMA under long-term confirms the downtrend, RSI oversold or near
+        hammer = hammer and vol_ok and ema_fast < ema_slow and rsi <= rsi_oversold
+        # shooting star: short-term EMA above long-term confirms the uptrend
+        star = star and vol_ok and ema_fast > ema_slow and rsi >= rsi_overbought
+        return int(hammer), int(star), rsi
+
+    # compile now instead of on the first closed candle
+    evaluate(np.zeros((6, 6)), 0.0, 0.0, 0.0, 0.0, 0.0)
+    _EVALUATORS[key] = evaluate
+    return evaluate
+
+
+evaluate_signals = make_evaluator(VOLUME_MULTIPLIER, RSI_OVERSOLD, RSI_OVERBOUGHT)
+
+
+# full analysis for a pair, on the buffered closed candles
+def analyze_pair_from_buffer(pair):
+    arr = candles_array(pair)
 
     # Use last 6 closed candles: previous 5 for trend, last one = pattern candle (closed)
-    if len(df) < 6:
+    state = indicators.get(pair)
+    if len(arr) < 6 or state is None:
         return []
 
-    last6 = df.iloc[-6:]
-    trend_candles = last6.iloc[0:5].to_dict("records")   # older -> newer, 5 candles
-    pattern_candle = last6.iloc[-1].to_dict()            # closed pattern candle
-    last_vol = pattern_candle["volume"]
-    avg_vol = df["volume"][-20:].mean() if len(df) >= 20 else df["volume"].mean()
-
-    # indicators (on full df)
-    df["rsi"] = compute_rsi(df["close"], RSI_PERIOD)
-    df["ema_fast"] = compute_ema(df["close"], EMA_FAST)
-    df["ema_slow"] = compute_ema(df["close"], EMA_SLOW)
+    # the incremental state is already updated as each candle is buffered
+    avg_vol = state["vol_sum"] / len(state["vols"])
+    hammer, star, rsi_val = evaluate_signals(arr[-6:], state["ema_fast"], state["ema_slow"],
+                                             state["gain_avg"], state["loss_avg"], avg_vol)
+    if not (hammer or star):
+        return []
 
-    pattern_time = last6.index[-1].strftime("%Y-%m-%d %H:%M UTC")
+    ts, pattern_close, last_vol = arr[-1, 0], arr[-1, 4], arr[-1, 5]   # closed pattern candle
+    pattern_time = utc_stamp(ts / 1000, "%Y-%m-%d %H:%M UTC")
+    meta = {"rsi": float(rsi_val), "avg_vol": float(avg_vol), "last_vol": float(last_vol)}
     signals = []
+    if hammer:
+        signals.append(("HAMMER", "LONG", float(pattern_close), pattern_time, meta))
+    if star:
+        signals.append(("SHOOTING_STAR", "SHORT", float(pattern_close), pattern_time, meta))
+    return signals
 
-    # Volume filter
-    vol_ok = (avg_vol is not None) and (last_vol >= avg_vol * VOLUME_MULTIPLIER)
-
-    # EMA trend confirmation (use EMA slope or cross)
-    ema_fast = df["ema_fast"].iloc[-2]   # use previous value (closed)
-    ema_slow = df["ema_slow"].iloc[-2]
-
-    # RSI value for pattern candle (use closed candle's rsi)
-    rsi_val = df["rsi"].iloc[-2]  # rsi of the closed pattern candle
-
-    # HAMMER logic
-    if is_hammer_candle(pattern_candle):
-        trend_ok = trend_confirmation(trend_candles, direction="down", required_count=3)
-        ema_ok = ema_fast < ema_slow  # short-term under long-term => confirms downtrend
-        rsi_ok = (rsi_val <= RSI_OVERSOLD)  # e.g., oversold or near
-        if trend_ok and ema_ok and vol_ok and rsi_ok:
-            signals.append(("HAMMER", "LONG", pattern_candle["close"], pattern_time,
-                            {"rsi": float(rsi_val), "avg_vol": float(avg_vol), "last_vol": float(last_vol)}))
-
-    # SHOOTING STAR logic
-    if is_shooting_star_candle(pattern_candle):
-        trend_ok = trend_confirmation(trend_candles, direction="up", required_count=3)
-        ema_ok = ema_fast > ema_slow  # short-term above long-term => confirms uptrend
-        rsi_ok = (rsi_val >= RSI_OVERBOUGHT)
-        if trend_ok and ema_ok and vol_ok and rsi_ok:
-            signals.append(("SHOOTING_STAR", "SHORT", pattern_candle["close"], pattern_time,
-                            {"rsi": float(rsi_val), "avg_vol": float(avg_vol), "last_vol": float(last_vol)}))
 
-    return signals
+# ========== DATA FEED ==========
+def push_closed(pair, candle):
+    if candle_count[pair] and candle[0] <= candles[pair][-1, 0]:
+        return False
+    buf = candles[pair]
+    buf[:-1] = buf[1:]   # shift up one row in place
+    buf[-1] = candle
+    candle_count[pair] = min(candle_count[pair] + 1, WARMUP_LIMIT)
+    update_indicators(pair, candle)
+    return True
+
+
+async def fetch_closed(pair, sem):
+    # REST fetch; returns how many newly closed candles were buffered
+    since, limit, stale = None, WARMUP_LIMIT + 1, False
+    now = exchange.milliseconds()
+    last_ts = candles[pair][-1, 0]
+    if candle_count[pair] and now - last_ts < WARMUP_LIMIT * TIMEFRAME_MS:
+        # buffer (or cache) is recent enough to bridge: only ask for what came after
+        # it -- in steady state the one newly closed candle plus the forming one (+1 for safety)
+        since = int(last_ts) + TIMEFRAME_MS
+        limit = min(limit, (now - since) // TIMEFRAME_MS + 2)
+    elif candle_count[pair]:
+        # too far behind to bridge the gap; start over from a full fetch
+        stale = True
+
+    async with sem:
+        data = await exchange.fetch_ohlcv(pair, timeframe=TIMEFRAME, since=since, limit=limit)
+    if stale:
+        # only drop the old buffer once the replacement is in hand
+        candle_count[pair] = 0
+        indicators.pop(pair, None)
+    # last row is the candle still forming; it is left to the stream, since a REST
+    # snapshot of it is partial and must never be buffered as closed
+    added = sum(push_closed(pair, c) for c in data[:-1])
+    if added:
+        save_cache(pair)
+    return added
+
+
+async def watch_pair(pair, queue, sem):
+    while True:
+        try:
+            updates = await exchange.watch_ohlcv(pair, TIMEFRAME)
+        except Exception as e:
+            print(f"[{pair}] stream error: {e}")
+            # the last update seen may be partial; the REST backfill below takes over
+            forming.pop(pair, None)
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+
+        for candle in updates:
+            current = forming.get(pair)
+            forming[pair] = candle
+            if current is not None and candle[0] <= current[0]:
+                continue   # update of the candle still forming
+
+            last_ts = candles[pair][-1, 0] if candle_count[pair] else None
+            if last_ts is not None and candle[0] <= last_ts + TIMEFRAME_MS:
+                continue   # buffer already holds every candle before this one
+
+            if (current is not None and last_ts is not None
+                    and candle[0] == current[0] + TIMEFRAME_MS
+                    and current[0] == last_ts + TIMEFRAME_MS):
+                # the stream moved on to the next candle: the one it followed is closed
+                if push_closed(pair, current):
+                    save_cache(pair)
+                    queue.put_nowait(pair)
+            else:
+                # start-up, reconnect, a skipped rollover or an empty buffer (failed
+                # warm-up): closed candles are missing, backfill them over REST
+                # instead of guessing; a failed backfill is retried at the next rollover
+                try:
+                    if await fetch_closed(pair, sem):
+                        queue.put_nowait(pair)
+                except Exception as e:
+                    print(f"[{pair}] backfill error: {e}")
+
+
+async def fetch_all_closed(sem):
+    # binance has no multi-symbol klines endpoint: fan the per-pair fetches out
+    # concurrently, bounded by sem so a long PAIRS list can't burst past the weight limit
+    results = await asyncio.gather(*(fetch_closed(p, sem) for p in PAIRS), return_exceptions=True)
+    added = {}
+    for pair, res in zip(PAIRS, results):
+        if isinstance(res, Exception):
+            print(f"[{pair}] fetch error: {res}")
+        else:
+            added[pair] = res
+    return added
 
 
-# ========== MAIN LOOP ==========
 def seconds_to_next_15min():
     now = int(time.time())
     rem = now % (15 * 60)
     return (15 * 60) - rem if rem != 0 else 0
 
 
-def main():
-    print("STRICT+INDICATORS Hammer/ShootingStar BOT STARTED")
-    wait = seconds_to_next_15min()
-    if wait:
-        print(f"Aligning to next 15m close: sleeping {wait+1} sec")
-        time.sleep(wait + 1)
-
+async def poll_pairs(queue, sem):
+    # REST fallback: one concurrent fetch per pair at each 15m close;
+    # ccxt's built-in rate limiter paces the requests
     while True:
-        cycle_start = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        to_sleep = seconds_to_next_15min()
+        print(f"Sleeping {to_sleep+1} sec until next 15m candle close...")
+        await asyncio.sleep(to_sleep + 1)
+
+        cycle_start = utc_stamp()
         print(f"[{cycle_start}] Scanning pairs: {', '.join(PAIRS)}")
-        for pair in PAIRS:
+        for pair, added in (await fetch_all_closed(sem)).items():
+            if added:
+                queue.put_nowait(pair)
+
+
+# ========== MAIN LOOP ==========
+def batch_messages(messages, limit=TG_MAX_LEN):
+    # join into as few Telegram messages as fit under the length limit
+    batches = []
+    for msg in messages:
+        if batches and len(batches[-1]) + 2 + len(msg) <= limit:
+            batches[-1] += "\n\n" + msg
+        else:
+            batches.append(msg)
+    return batches
+
+
+def report_signals(results):
+    # results: [(pair, signals)] for every pair that closed a candle this cycle
+    stamp = utc_stamp()   # one timestamp for every signal of this candle close
+    messages = []
+    for pair, signals in results:
+        if not signals:
+            print(f"[{pair}] No confirmed pattern.")
+            continue
+
+        for typ, direction, price, tme, meta in signals:
+            if typ == "HAMMER":
+                title = "🟢 Hammer (confirmed)"
+            else:
+                title = "🔴 Shooting Star (confirmed)"
+
+            messages.append(f"{title}\nPair: {pair}\nPattern time (closed): {tme}\n"
+                            f"Direction: {direction}\nPrice: {price}\n"
+                            f"RSI: {meta['rsi']:.1f} | vol: {meta['last_vol']:.3f} (avg {meta['avg_vol']:.3f})\nTF: {TIMEFRAME}")
+            log_signal(f"{pair} | {typ} | {direction} | price={price} | time={tme} | rsi={meta['rsi']:.1f}", stamp)
+            print(f"[{pair}] SIGNAL -> {typ} @ {price} (rsi {meta['rsi']:.1f})")
+
+    for text in batch_messages(messages):
+        send_telegram(text)
+
+
+async def process_closed_candles(queue):
+    while True:
+        pairs = [await queue.get()]
+        # the other pairs close on the same boundary, but binance pushes kline updates
+        # every 2 s so their rollovers trail by up to that; wait until every pair is
+        # in, or BATCH_WINDOW has passed
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BATCH_WINDOW
+        while len(set(pairs)) < len(PAIRS):
+            try:
+                pairs.append(await asyncio.wait_for(queue.get(), deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+
+        results = []
+        for pair in dict.fromkeys(pairs):
             try:
-                signals = analyze_pair(pair)
-                if signals:
-                    for typ, direction, price, tme, meta in signals:
-                        if typ == "HAMMER":
-                            title = "🟢 Hammer (confirmed)"
-                        else:
-                            title = "🔴 Shooting Star (confirmed)"
-
-                        msg = (f"{title}\nPair: {pair}\nPattern time (closed): {tme}\n"
-                               f"Direction: {direction}\nPrice: {price}\n"
-                               f"RSI: {meta['rsi']:.1f} | vol: {meta['last_vol']:.3f} (avg {meta['avg_vol']:.3f})\nTF: {TIMEFRAME}")
-                        send_telegram(msg)
-                        log_signal(f"{pair} | {typ} | {direction} | price={price} | time={tme} | rsi={meta['rsi']:.1f}")
-                        print(f"[{pair}] SIGNAL -> {typ} @ {price} (rsi {meta['rsi']:.1f})")
-                else:
-                    print(f"[{pair}] No confirmed pattern.")
+                results.append((pair, analyze_pair_from_buffer(pair)))
             except Exception as e:
                 print(f"[{pair}] error:", e)
-            time.sleep(INTER_DELAY)
+        try:
+            # Telegram/log IO is blocking; keep it off the event loop
+            await asyncio.to_thread(report_signals, results)
+        except Exception as e:
+            print("Report error:", e)
 
-        to_sleep = seconds_to_next_15min()
-        if to_sleep == 0:
-            to_sleep = 15 * 60
-        print(f"Cycle complete. Sleeping {to_sleep+1} sec until next 15m candle close...")
-        time.sleep(to_sleep + 1)
+
+async def main_async():
+    print("STRICT+INDICATORS Hammer/ShootingStar BOT STARTED")
+    queue = asyncio.Queue()
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)   # shared by every REST fetch
+    try:
+        # load markets up front so the first fetch/subscribe doesn't pay for it lazily
+        try:
+            await exchange.load_markets()
+            for pair in PAIRS:
+                if pair not in exchange.markets:
+                    print(f"[{pair}] not listed on {exchange.id}")
+        except Exception as e:
+            print("load_markets error:", e)
+
+        for pair in PAIRS:
+            load_cache(pair)
+        # warm-up: history for the indicators (or just the gap since the cache),
+        # all pairs in one round-trip window
+        await fetch_all_closed(sem)
+
+        if USE_WEBSOCKET:
+            print(f"Streaming {TIMEFRAME} klines: {', '.join(PAIRS)}")
+            feeds = [watch_pair(p, queue, sem) for p in PAIRS]
+        else:
+            feeds = [poll_pairs(queue, sem)]
+        await asyncio.gather(process_closed_candles(queue), *feeds)
+    finally:
+        await exchange.close()
+
+
+def main():
+    if uvloop is not None:
+        uvloop.run(main_async())
+    else:
+        asyncio.run(main_async())
 
 
 if __name__ == "__main__":